@@ -1,10 +1,17 @@
 # region imports
 import numpy as np
 import math
+import functools
+import collections
+import warnings
 from scipy.optimize import fsolve
 import random as rnd
 # endregion
 
+# region constants
+FLOW_XTOL = 1e-5  # relative tolerance on the flow rates for fsolve; inputs only carry 2-3 significant figures
+# endregion
+
 # region class definitions
 class Fluid:
     # region constructor
@@ -21,7 +28,7 @@ class Fluid:
 
 class Node:
     # region constructor
-    def __init__(self, Name='a', Pipes=[], ExtFlow=0):
+    def __init__(self, Name='a', Pipes=None, ExtFlow=0):
         """
         Initializes the Node in the pipe network.
         :param Name: the name of the node
@@ -29,7 +36,7 @@ class Node:
         :param ExtFlow: any external flow into (+) or out (-) of this node in L/s
         """
         self.name = Name
-        self.pipes = Pipes  # a list of pipes connected to this node
+        self.pipes = [] if Pipes is None else Pipes  # a list of pipes connected to this node
         self.extFlow = ExtFlow  # external flow into (+) or out (-) of this node in L/s
     # endregion
 
@@ -47,14 +54,14 @@ class Node:
 
 class Loop:
     # region constructor
-    def __init__(self, Name='A', Pipes=[]):
+    def __init__(self, Name='A', Pipes=None):
         """
         Initializes the Loop in the pipe network.
         :param Name: the name of the loop
         :param Pipes: a list/array of pipes in this loop
         """
         self.name = Name
-        self.pipes = Pipes
+        self.pipes = [] if Pipes is None else Pipes
     # endregion
 
     # region methods/functions
@@ -74,7 +81,7 @@ class Loop:
 
 class Pipe:
     # region constructor
-    def __init__(self, Start='A', End='B', L=100, D=200, r=0.00025, fluid=Fluid()):
+    def __init__(self, Start='A', End='B', L=100, D=200, r=0.00025, fluid=None):
         """
         Initializes the Pipe in the pipe network.
         :param Start: the start node (alphabetically)
@@ -82,20 +89,47 @@ class Pipe:
         :param L: the length of the pipe in meters
         :param D: the diameter of the pipe in millimeters
         :param r: the roughness of the pipe in meters
-        :param fluid: the fluid flowing through the pipe
+        :param fluid: the fluid flowing through the pipe (water if None)
         """
         self.startNode = min(Start, End)  # start node (alphabetically)
         self.endNode = max(Start, End)  # end node (alphabetically)
         self.length = L
         self.diameter = D / 1000.0  # diameter in m
         self.r = r
-        self.fluid = fluid
+        self.fluid = Fluid() if fluid is None else fluid
         self.A = math.pi * (self.diameter / 2) ** 2  # cross-sectional area
+        self._net = None  # PipeNetwork holding this pipe's flow rate once packed
+        self._idx = None  # index of this pipe in the network's arrays
+        self._q = 10  # flow rate used until the pipe is packed into a network
         self.Q = 10  # initial guess for flow rate in L/s
         self.vel = self.V()  # velocity in m/s
         self.reynolds = self.Re()  # Reynolds number
     # endregion
 
+    # region properties
+    @property
+    def Q(self):
+        """
+        Volumetric flow rate in L/s.  Once packed, this is a view into the owning network's flow array.
+        """
+        return self._q if self._net is None else self._net._Q[self._idx]
+
+    @Q.setter
+    def Q(self, value):
+        if self._net is None:
+            self._q = value
+        else:
+            self._net._Q[self._idx] = value
+
+    @property
+    def _hl_const(self):
+        """
+        L/(D*2g*A^2), so that head loss = ff * _hl_const * Q^2 (Q in m^3/s).  Derived from the current
+        dimensions rather than fixed at construction, so a changed length or diameter is picked up.
+        """
+        return self.length / self.diameter / (2 * 9.81 * self.A ** 2)
+    # endregion
+
     # region methods/functions
     def V(self):
         """
@@ -110,21 +144,25 @@ class Pipe:
         Calculate the Reynolds number under current conditions.
         :return: Reynolds number as a float.
         """
-        self.reynolds = (self.fluid.rho * self.vel * self.diameter) / self.fluid.mu
+        self.reynolds = (self.fluid.rho * abs(self.V()) * self.diameter) / self.fluid.mu
         return self.reynolds
 
-    def FrictionFactor(self):
+    def FrictionFactor(self, stochastic=False):
         """
         Calculates the friction factor for the pipe flow based on flow regime.
+        In the transitional regime (2000 < Re < 4000) the friction factor is blended linearly between the
+        laminar and Colebrook values.
+        :param stochastic: if True, draw the transitional friction factor from a normal distribution about the
+        blended value (sigma = 20% of it) to model the uncertainty of that regime.  This makes the result
+        non-deterministic, so leave it off when the friction factor feeds a solver.
         :return: The Darcy friction factor as a float.
         """
         Re = self.Re()
         rr = self.r / self.diameter
 
         def CB():
-            cb = lambda f: 1 / (f ** 0.5) + 2.0 * np.log10(rr / 3.7 + 2.51 / (Re * f ** 0.5))
-            result = fsolve(cb, [0.01])
-            return result[0]
+            # nearby (Re, rr) pairs share a cache entry
+            return _colebrook_cached(roundSigFigs(Re), roundSigFigs(rr))
 
         def lam():
             return 64 / Re
@@ -137,6 +175,8 @@ class Pipe:
             CBff = CB()
             Lamff = lam()
             mean = Lamff + ((Re - 2000) / (4000 - 2000)) * (CBff - Lamff)
+            if not stochastic:
+                return mean
             sig = 0.2 * mean
             return rnd.normalvariate(mean, sig)
 
@@ -145,9 +185,8 @@ class Pipe:
         Calculate head loss through a section of pipe in m of fluid using the Darcy-Weisbach equation.
         :return: Head loss as a float.
         """
-        g = 9.81  # m/s^2
         ff = self.FrictionFactor()
-        hl = (ff * self.length / self.diameter) * (self.vel ** 2 / (2 * g))
+        hl = ff * self._hl_const * (self.Q / 1000.0) ** 2
         return hl
 
     def getFlowHeadLoss(self, s):
@@ -194,7 +233,7 @@ class Pipe:
 
 class PipeNetwork:
     # region constructor
-    def __init__(self, Pipes=[], Loops=[], Nodes=[], fluid=Fluid()):
+    def __init__(self, Pipes=None, Loops=None, Nodes=None, fluid=None):
         """
         Initializes the PipeNetwork with pipes, nodes, loops, and fluid.
         :param Pipes: List of Pipe objects in the network.
@@ -202,56 +241,228 @@ class PipeNetwork:
         :param Nodes: List of Node objects in the network.
         :param fluid: Fluid object representing the fluid in the network.
         """
-        self.loops = Loops
-        self.nodes = Nodes
-        self.fluid = fluid
-        self.pipes = Pipes
+        # a new list/Fluid per network; mutable default arguments would be shared by every instance
+        self.loops = [] if Loops is None else Loops
+        self.nodes = [] if Nodes is None else Nodes
+        self.fluid = Fluid() if fluid is None else fluid
+        self.pipes = [] if Pipes is None else Pipes
+        self._Q = None  # structure of arrays for the pipes, built by _pack()
+        self._pipe_by_name = {}  # name -> list index lookup tables, rebuilt by getPipe()/getNode() when stale
+        self._node_by_name = {}
     # endregion
 
     # region methods/functions
+    def _packIfNeeded(self):
+        """
+        Packs the network if pipes, nodes or loops have been added or removed since the last _pack().
+        """
+        if self._Q is None or self._N_inc.shape != (len(self.nodes), len(self.pipes)) \
+                or len(self._L_inc) != len(self.loops):
+            self._pack()
+
+    def _pack(self):
+        """
+        Copies the numerical state of the pipes into contiguous arrays and binds each pipe to its slot,
+        so that Pipe.Q reads and writes self._Q directly.
+        Raises ValueError if the external flows into the network do not add up to zero: no pipe flows can
+        satisfy continuity at every node then.
+        """
+        extFlow = np.array([n.extFlow for n in self.nodes], dtype=float)  # external flows in L/s
+        if abs(extFlow.sum()) > 1e-9 * max(np.abs(extFlow).sum(), 1.0):
+            raise ValueError(f'external flows into the network add up to {extFlow.sum():g} L/s, not zero')
+        self._Q = np.array([p.Q for p in self.pipes], dtype=float)  # flow rates in L/s
+        self._D = np.array([p.diameter for p in self.pipes], dtype=float)
+        self._A = np.array([p.A for p in self.pipes], dtype=float)
+        L = np.array([p.length for p in self.pipes], dtype=float)
+        self._hl_const = L / self._D / (2 * 9.81 * self._A ** 2)  # same as Pipe._hl_const, from current dimensions
+        self._r = np.array([p.r for p in self.pipes], dtype=float)
+        self._rho = np.array([p.fluid.rho for p in self.pipes], dtype=float)
+        self._mu = np.array([p.fluid.mu for p in self.pipes], dtype=float)
+        self._extFlow = extFlow
+        for i, p in enumerate(self.pipes):
+            p._net = self
+            p._idx = i
+
+        # incidence matrices: flow into each node from each pipe, and traversal sign of each pipe around each loop
+        self._N_inc = np.zeros((len(self.nodes), len(self.pipes)))
+        for i, n in enumerate(self.nodes):
+            for p in n.pipes:
+                self._N_inc[i, p._idx] = 1 if n.name == p.endNode else -1
+        self._L_inc = np.zeros((len(self.loops), len(self.pipes)))
+        for i, l in enumerate(self.loops):
+            startNode = l.pipes[0].startNode
+            for p in l.pipes:
+                self._L_inc[i, p._idx] = 1 if startNode == p.startNode else -1
+                startNode = p.endNode if startNode != p.endNode else p.startNode
+
     def findFlowRates(self):
         """
         Analyzes the pipe network and finds the flow rates in each pipe.
-        :return: List of flow rates in the pipes.
-        """
-        N = len(self.nodes) + len(self.loops)
-        Q0 = np.full(N, 10)  # initial guess
+        The unknowns are the pipe flow rates.  The continuity equation of the first node is left out: with
+        balanced external flows it follows from the others, and the remaining node and loop equations
+        give exactly one equation per pipe.
+        :return: Array of flow rates in the pipes in L/s.
+        """
+        self._pack()
+        N = len(self.pipes)
+        if len(self.nodes) - 1 + len(self.loops) != N:
+            raise ValueError(f'network has {N - len(self.nodes) + 1} independent loops but '
+                             f'{len(self.loops)} loops are defined')
+        Q0 = np.full(N, 10.0)  # initial guess
 
         def fn(q):
-            for i in range(len(self.pipes)):
-                self.pipes[i].Q = q[i]  # update flow rate in pipes
-            L = self.getNodeFlowRates()  # net flow rates at nodes
-            L += self.getLoopHeadLosses()  # net head losses in loops
-            return L
-
-        FR = fsolve(fn, Q0)
+            self._Q[:] = q  # update flow rate in pipes
+            # net flow rates at nodes (but the first) followed by net head losses in loops
+            return _residual(self._Q, self._D, self._A, self._r, self._rho, self._mu, self._hl_const,
+                             self._N_inc, self._L_inc, self._extFlow)[1:]
+
+        def jac(q):
+            # node rows are constant; loop rows come from the pipe head loss derivatives
+            self._Q[:] = q
+            return np.vstack((self._N_inc[1:] / 1000, self._L_inc * self._getHeadLossDerivatives()))
+
+        FR = _fsolveChecked(fn, Q0, jac)
+        self._Q[:] = FR
         return FR
 
+    def solveLoopFlow(self):
+        """
+        Finds the flow rates in each pipe using the loop flow (Epp-Fowler) formulation.
+        Pipe flows that satisfy continuity at every node are found on a spanning tree of the network first.
+        Adding a circulating flow around a loop keeps continuity satisfied, so only one flow correction per
+        loop is solved for (an L x L system rather than one unknown per pipe).
+        :return: Array of flow rates in the pipes in L/s.
+        """
+        self._pack()
+        Q0 = self._getTreeFlows()  # also checks that the network is connected
+        if len(self.loops) != len(self.pipes) - len(self.nodes) + 1:
+            # pipes outside the spanning tree would silently keep zero flow
+            raise ValueError(f'network has {len(self.pipes) - len(self.nodes) + 1} independent loops but '
+                             f'{len(self.loops)} loops are defined')
+        if len(self.loops) == 0:
+            self._Q[:] = Q0  # a tree: continuity alone fixes every flow
+            return self._Q.copy()
+        nNodes = len(self.nodes)
+
+        def fn(dQ):
+            self._Q[:] = Q0 + self._L_inc.T @ dQ
+            # only the net head losses in loops, continuity holds by construction
+            return _residual(self._Q, self._D, self._A, self._r, self._rho, self._mu, self._hl_const,
+                             self._N_inc, self._L_inc, self._extFlow)[nNodes:]
+
+        def jac(dQ):
+            self._Q[:] = Q0 + self._L_inc.T @ dQ
+            return (self._L_inc * self._getHeadLossDerivatives()) @ self._L_inc.T
+
+        dQ = _fsolveChecked(fn, np.zeros(len(self.loops)), jac)
+        self._Q[:] = Q0 + self._L_inc.T @ dQ
+        return self._Q.copy()
+
+    def _getTreeFlows(self):
+        """
+        Finds pipe flows that satisfy continuity at every node by sending all external flow along a spanning
+        tree of the network (depth-first from the first node).  Pipes not in the tree carry no flow.
+        :return: Array of flow rates in the pipes in L/s.
+        """
+        Q = np.zeros(len(self.pipes))
+        nodes = {n.name: n for n in self.nodes}
+        start = self.nodes[0].name
+        treePipe = {start: None}  # pipe through which the search reached each node
+        order = [start]
+        stack = [start]
+        while stack:
+            name = stack.pop()
+            for p in nodes[name].pipes:
+                other = p.endNode if name == p.startNode else p.startNode
+                if other not in treePipe:
+                    treePipe[other] = p
+                    order.append(other)
+                    stack.append(other)
+        if len(order) != len(self.nodes):
+            unreached = sorted(set(nodes) - set(order))
+            raise ValueError(f'pipe network is not connected, nodes {unreached} cannot be reached from {start}')
+
+        # leaves first: each node passes its net inflow up the tree pipe to its parent
+        imbalance = {name: n.extFlow for name, n in nodes.items()}  # net inflow in L/s not yet carried away
+        for name in reversed(order[1:]):
+            p = treePipe[name]
+            parent = p.startNode if name == p.endNode else p.endNode
+            Q[p._idx] = -imbalance[name] if name == p.endNode else imbalance[name]
+            imbalance[parent] += imbalance[name]
+        return Q
+
+    def _getHeadLossDerivatives(self):
+        """
+        Derivative of each pipe's signed head loss with respect to its flow rate in L/s.  With
+        hl = sign(Q)*f(Re)*hl_const*Q^2 and Re proportional to |Q|:
+        d(hl)/dQ = hl_const*|Q|*(2*f + Re*df/dRe) (Q converted to m^3/s).  In laminar flow head loss is
+        linear in Q and this reduces to hl_const*|Q|*64/Re, which is independent of Q (and so also valid
+        for a pipe with no flow).
+        :return: Array of d(hl)/dQ in m of fluid per L/s, ordered as self.pipes.
+        """
+        Re = self._getReynoldsNumbers()
+        rr = self._r / self._D
+        ff = _frictionFactorsKernel(Re, rr)
+        slope = _frictionFactorSlopesKernel(Re, rr)
+        lam = self._hl_const * 64 * 1000 * self._mu * self._A / (self._rho * self._D) / 1e6  # |Q|/Re is constant
+        return np.where(Re <= 2000, lam, self._hl_const * np.abs(self._Q) * (2 * ff + slope) / 1e6)
+
     def getNodeFlowRates(self):
         """
-        Calculates net flow rates at nodes.
-        :return: List of net flow rates at nodes.
+        Calculates net flow rates at nodes from the node incidence matrix.
+        :return: Array of net flow rates into the nodes in m^3/s.
         """
-        qNet = [n.getNetFlowRate() for n in self.nodes]
+        self._packIfNeeded()
+        extFlow = np.array([n.extFlow for n in self.nodes], dtype=float)  # read fresh, may change after packing
+        qNet = self._N_inc @ (self._Q / 1000) + extFlow / 1000
         return qNet
 
     def getLoopHeadLosses(self):
         """
-        Calculates net head losses in loops.
-        :return: List of net head losses in loops.
+        Calculates net head losses in loops from the loop incidence matrix.
+        :return: Array of net head losses around the loops in m of fluid.
         """
-        lhl = [l.getLoopHeadLoss() for l in self.loops]
+        hl = self.getPipeHeadLosses()
+        hl = np.sign(self._Q) * hl  # head loss signed by flow direction
+        lhl = self._L_inc @ hl
         return lhl
 
+    def getPipeHeadLosses(self):
+        """
+        Calculates the friction head loss in every pipe at once using NumPy arrays.
+        :return: Array of head losses in m of fluid, ordered as self.pipes.
+        """
+        ff = self.getPipeFrictionFactors()
+        return ff * self._hl_const * (self._Q / 1000) ** 2
+
+    def getPipeFrictionFactors(self):
+        """
+        Calculates the friction factor in every pipe at once using NumPy arrays.
+        :return: Array of Darcy friction factors, ordered as self.pipes.
+        """
+        return frictionFactors(self._getReynoldsNumbers(), self._r / self._D)
+
+    def _getReynoldsNumbers(self):
+        """
+        Calculates the Reynolds number in every pipe from the packed arrays.
+        :return: Array of Reynolds numbers, ordered as self.pipes.
+        """
+        self._packIfNeeded()
+        vel = (self._Q / 1000) / self._A  # convert L/s to m^3/s and calculate velocity
+        return self._rho * np.abs(vel) * self._D / self._mu
+
     def getPipe(self, name):
         """
         Retrieves a pipe object by its name.
         :param name: Name of the pipe to retrieve.
         :return: Pipe object.
         """
-        for p in self.pipes:
-            if name == p.Name():
-                return p
+        i = self._pipe_by_name.get(name)
+        # the list may have been changed directly since the table was built: check the hit is still there
+        if i is None or i >= len(self.pipes) or self.pipes[i].Name() != name:
+            self._pipe_by_name = {p.Name(): i for i, p in enumerate(self.pipes)}
+            i = self._pipe_by_name.get(name)
+        return None if i is None else self.pipes[i]
 
     def getNodePipes(self, node):
         """
@@ -271,10 +482,7 @@ class PipeNetwork:
         :param node: Name of the node to check.
         :return: True if the node exists, False otherwise.
         """
-        for n in self.nodes:
-            if n.name == node:
-                return True
-        return False
+        return self.getNode(node) is not None
 
     def getNode(self, name):
         """
@@ -282,19 +490,26 @@ class PipeNetwork:
         :param name: Name of the node to retrieve.
         :return: Node object.
         """
-        for n in self.nodes:
-            if n.name == name:
-                return n
+        i = self._node_by_name.get(name)
+        # the list may have been changed directly since the table was built: check the hit is still there
+        if i is None or i >= len(self.nodes) or self.nodes[i].name != name:
+            self._node_by_name = {n.name: i for i, n in enumerate(self.nodes)}
+            i = self._node_by_name.get(name)
+        return None if i is None else self.nodes[i]
 
     def buildNodes(self):
         """
-        Automatically creates the node objects based on the pipe ends.
+        Automatically creates the node objects based on the pipe ends, in a single pass over the pipes.
+        Nodes that already exist are kept.
         """
+        nodePipes = collections.defaultdict(list)  # node name -> pipes connected to it
         for p in self.pipes:
-            if not self.nodeBuilt(p.startNode):
-                self.nodes.append(Node(p.startNode, self.getNodePipes(p.startNode)))
-            if not self.nodeBuilt(p.endNode):
-                self.nodes.append(Node(p.endNode, self.getNodePipes(p.endNode)))
+            nodePipes[p.startNode].append(p)
+            nodePipes[p.endNode].append(p)
+        built = {n.name for n in self.nodes}
+        for name in sorted(nodePipes):
+            if name not in built:
+                self.nodes.append(Node(name, nodePipes[name]))
 
     def printPipeFlowRates(self):
         """
@@ -307,20 +522,142 @@ class PipeNetwork:
         """
         Prints the net flow into each node in the network.
         """
-        for n in self.nodes:
-            print(f'net flow into node {n.name} is {n.getNetFlowRate():0.4f} m^3/s')
+        for n, q in zip(self.nodes, self.getNodeFlowRates()):
+            print(f'net flow into node {n.name} is {q:0.4f} m^3/s')
 
     def printLoopHeadLoss(self):
         """
         Prints the head loss for each loop in the network.
         """
-        for l in self.loops:
-            print(f'head loss for loop {l.name} is {l.getLoopHeadLoss():0.4f} m of fluid')
+        for l, hl in zip(self.loops, self.getLoopHeadLosses()):
+            print(f'head loss for loop {l.name} is {hl:0.4f} m of fluid')
     # endregion
 
 # endregion
 
 # region function definitions
+def roundSigFigs(x, n=6):
+    """
+    Rounds a number to n significant figures.
+    :param x: the number to round
+    :param n: number of significant figures to keep
+    :return: x rounded to n significant figures.
+    """
+    if x == 0:
+        return 0.0
+    return round(x, -int(math.floor(math.log10(abs(x)))) + n - 1)
+
+@functools.lru_cache(maxsize=4096)
+def _colebrook_cached(Re, rr):
+    """
+    Serghides's explicit solution of the Colebrook equation, memoized on (Re, rr).
+    :param Re: Reynolds number (rounded by the caller so neighbouring values share an entry)
+    :param rr: relative roughness r/D
+    :return: The Darcy friction factor as a float.
+    """
+    # scalar inputs, so math.log10 avoids the overhead of a NumPy ufunc call
+    A = -2.0 * math.log10(rr / 3.7 + 12 / Re)
+    B = -2.0 * math.log10(rr / 3.7 + 2.51 * A / Re)
+    C = -2.0 * math.log10(rr / 3.7 + 2.51 * B / Re)
+    return (A - (B - A) ** 2 / (C - 2 * B + A)) ** -2
+
+def _fsolveChecked(fn, x0, jac):
+    """
+    Runs fsolve with an analytic Jacobian and warns only if it really failed.  MINPACK stops on the size of
+    the step alone, so when Newton lands on the root in one step (e.g. a linear, all-laminar system) it can
+    report 'not making good progress' with the residual already at round-off level.  The initial step bound
+    is kept small (factor=1): with the default of 100 the first trust region step from zero loop corrections
+    overshoots into a region where the dogleg stalls for large flows.
+    :param fn: residual function
+    :param x0: initial guess
+    :param jac: Jacobian of fn
+    :return: The solution as an array.
+    """
+    f0 = np.max(np.abs(fn(x0)))
+    x, info, ier, mesg = fsolve(fn, x0, fprime=jac, xtol=FLOW_XTOL, factor=1, full_output=True)
+    if ier != 1 and np.max(np.abs(info['fvec'])) > 1e-8 * f0:
+        warnings.warn(mesg, RuntimeWarning, stacklevel=3)
+    return x
+
+def _colebrookKernel(Re, rr):
+    """
+    Serghides's explicit solution of the Colebrook equation for 1-D arrays.  It is only used above
+    Re = 2000, so it is evaluated there; below that its log terms can go negative and produce NaN.
+    :param Re: array of Reynolds numbers
+    :param rr: array of relative roughness (r/D)
+    :return: Array of turbulent Darcy friction factors.
+    """
+    Re = np.maximum(Re, 2000)
+    A = -2.0 * np.log10(rr / 3.7 + 12 / Re)
+    B = -2.0 * np.log10(rr / 3.7 + 2.51 * A / Re)
+    C = -2.0 * np.log10(rr / 3.7 + 2.51 * B / Re)
+    return (A - (B - A) ** 2 / (C - 2 * B + A)) ** -2
+
+def _frictionFactorsKernel(Re, rr):
+    """
+    Deterministic friction factors for 1-D arrays of Reynolds numbers and relative roughness.
+    :param Re: array of Reynolds numbers
+    :param rr: array of relative roughness (r/D)
+    :return: Array of Darcy friction factors.
+    """
+    Re = np.maximum(Re, 1e-9)  # a pipe with no flow has no head loss, but its friction factor must stay finite
+    CBff = _colebrookKernel(Re, rr)
+    Lamff = 64 / Re
+    transff = Lamff + ((Re - 2000) / (4000 - 2000)) * (CBff - Lamff)
+    return np.where(Re >= 4000, CBff, np.where(Re <= 2000, Lamff, transff))
+
+def _frictionFactorSlopesKernel(Re, rr):
+    """
+    Logarithmic slope Re*d(ff)/d(Re) of the friction factors returned by _frictionFactorsKernel.
+    Laminar: ff = 64/Re, so the slope is -ff.  Turbulent: differentiating the Colebrook equation
+    1/sqrt(f) = -2*log10(rr/3.7 + 2.51/(Re*sqrt(f))) implicitly gives -2*f*k/(1+k) with
+    k = 2*2.51/(ln(10)*Re*(rr/3.7 + 2.51/(Re*sqrt(f)))).  Transitional: slope of the linear blend.
+    :param Re: array of Reynolds numbers
+    :param rr: array of relative roughness (r/D)
+    :return: Array of Re*d(ff)/d(Re).
+    """
+    Re = np.maximum(Re, 1e-9)
+    CBff = _colebrookKernel(Re, rr)
+    Lamff = 64 / Re
+    y = CBff ** -0.5
+    k = 2 * 2.51 / (np.log(10) * Re * (rr / 3.7 + 2.51 * y / Re))
+    CBslope = -2 * CBff * k / (1 + k)
+    t = (Re - 2000) / (4000 - 2000)
+    transSlope = -Lamff * (1 - t) + t * CBslope + Re * (CBff - Lamff) / (4000 - 2000)
+    return np.where(Re >= 4000, CBslope, np.where(Re <= 2000, -Lamff, transSlope))
+
+def _residual(q, D, A, r, rho, mu, hl_const, N_inc, L_inc, extFlow):
+    """
+    Residual of the pipe network equations for the packed pipe arrays of a PipeNetwork.
+    :param q: flow rate in each pipe in L/s
+    :param hl_const: L/(D*2g*A^2) for each pipe, so that head loss = ff * hl_const * Q^2 (Q in m^3/s)
+    :param N_inc: node incidence matrix (nodes x pipes)
+    :param L_inc: loop incidence matrix (loops x pipes)
+    :param extFlow: external flow into each node in L/s
+    :return: Net flow into each node in m^3/s followed by the net head loss around each loop in m of fluid.
+    """
+    vel = (q / 1000) / A  # convert L/s to m^3/s and calculate velocity
+    Re = rho * np.abs(vel) * D / mu
+    ff = _frictionFactorsKernel(Re, r / D)
+    hl = np.sign(q) * ff * hl_const * (q / 1000) ** 2  # head loss signed by flow direction
+    return np.concatenate((N_inc @ (q / 1000) + extFlow / 1000, L_inc @ hl))
+
+def frictionFactors(Re, rr, stochastic=False):
+    """
+    Vectorized version of Pipe.FrictionFactor for arrays of Reynolds numbers and relative roughness.
+    :param Re: array of Reynolds numbers
+    :param rr: array of relative roughness (r/D)
+    :param stochastic: if True, randomize the transitional friction factor as in Pipe.FrictionFactor
+    :return: Array of Darcy friction factors.
+    """
+    Re, rr = np.broadcast_arrays(np.asarray(Re, dtype=float), np.asarray(rr, dtype=float))
+    shape = Re.shape
+    ff = _frictionFactorsKernel(Re.ravel(), rr.ravel())
+    trans = (Re.ravel() > 2000) & (Re.ravel() < 4000)
+    if stochastic and np.any(trans):
+        ff[trans] = np.random.normal(ff[trans], 0.2 * ff[trans])
+    return ff.reshape(shape)
+
 def main():
     '''
     This program analyzes flows in a given pipe network based on the following:
@@ -367,8 +704,8 @@ def main():
     PN.loops.append(Loop('B',[PN.getPipe('c-d'), PN.getPipe('d-g'),PN.getPipe('f-g'), PN.getPipe('c-f')]))
     PN.loops.append(Loop('C',[PN.getPipe('d-e'), PN.getPipe('e-h'),PN.getPipe('g-h'), PN.getPipe('d-g')]))
 
-    #call the findFlowRates method of the PN (a PipeNetwork object)
-    flow_rates = PN.findFlowRates()
+    #call the solveLoopFlow method of the PN (a PipeNetwork object)
+    flow_rates = PN.solveLoopFlow()
 
     #get output
     PN.printPipeFlowRates()
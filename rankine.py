@@ -43,7 +43,6 @@ class rankine:
         self.state2 = steam(self.p_low, s=self.state1.s, name='Turbine Exit')
         self.state2.calc()
 
-        self.state3 = steam(self.p_low, x=0, name='Pump Inlet')
         self.state3 = steam(self.p_low, x=0, name='Pump Inlet')  # Saturated liquid at low pressure
         self.state3.calc()
 
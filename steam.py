@@ -1,6 +1,19 @@
 # region imports
+import functools
+import os
+import tempfile
 import numpy as np
-from scipy.interpolate import griddata
+from scipy.interpolate import LinearNDInterpolator, RegularGridInterpolator
+
+
+# endregion
+
+# region steam table data
+# the tables live next to this module
+file_path_sat = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sat_water_table.txt')
+file_path_superheat = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'superheated_water_table.txt')
+_sat_table = None  # columns of the saturated table, loaded once by _load_tables()
+_superheat_interp = None  # (T, P) -> (h, s) interpolator for the superheated table, built once by _load_tables()
 
 
 # endregion
@@ -43,44 +56,13 @@ class steam():
     def calc(self):
         '''
         Determines the steam properties based on the provided primary and secondary
-        properties by using interpolation from the steam tables.
+        properties by using interpolation from the steam tables.  Results are cached by
+        the input properties, so repeated states (e.g. in a parameter sweep) are not recomputed.
         '''
-        # Load thermodynamic data from files
-        file_path_sat = r'C:\Users\Ethan\Desktop\Python Stuff\hw6sp24\sat_water_table.txt'
-        file_path_superheat = r'C:\Users\Ethan\Desktop\Python Stuff\hw6sp24\superheated_water_table.txt'
-
-        ts, ps, hfs, hgs, sfs, sgs, vfs, vgs = np.loadtxt(file_path_sat, skiprows=1, unpack=True)
-        tcol, hcol, scol, pcol = np.loadtxt(file_path_superheat, skiprows=1, unpack=True)
-
-        # Convert pressure to bar for the griddata function (as steam tables are in bar)
-        Pbar = self.p / 100  # 1 bar = 100 kPa
-
-        # Get saturated properties at the given pressure
-        Tsat = float(griddata(ps, ts, (Pbar), method='linear'))
-        hf = float(griddata(ps, hfs, (Pbar), method='linear'))
-        hg = float(griddata(ps, hgs, (Pbar), method='linear'))
-        sf = float(griddata(ps, sfs, (Pbar), method='linear'))
-        sg = float(griddata(ps, sgs, (Pbar), method='linear'))
-        vf = float(griddata(ps, vfs, (Pbar), method='linear'))
-        vg = float(griddata(ps, vgs, (Pbar), method='linear'))
-
-        # Determine the region (saturated, superheated) and calculate properties accordingly
-        if self.T is not None:
-            if self.T > Tsat:
-                self.region = 'Superheated'
-                self.h = float(griddata((tcol, pcol), hcol, (self.T, Pbar), method='linear'))
-                self.s = float(griddata((tcol, pcol), scol, (self.T, Pbar), method='linear'))
-                # Note: The ideal gas approximation for volume is a simplification
-                # For more accurate calculation, superheated steam tables or an equation of state should be used
-            else:
-                self.region = 'Saturated'
-                self.x = (self.h - hf) / (hg - hf) if self.h else None
-                self.s = sf if self.x is None else sf + self.x * (sg - sf)
-                self.v = vf if self.x is None else vf + self.x * (vg - vf)
-                self.T = Tsat
-
-        # The missing implementations for conditions based on 'x', 'h', and 's' have been omitted for brevity
-        # Further logic should be added based on the homework requirements and the available data
+        T, x, v, h, s, region = _compute_cached(self.p, self.T, self.x, self.v, self.h, self.s)
+        self.T, self.x, self.v, self.h, self.s = T, x, v, h, s
+        if region is not None:
+            self.region = region
 
     def print(self):
         """
@@ -106,6 +88,143 @@ class steam():
 # endregion
 
 # region function definitions
+def _ensure_npy_cache(file_path):
+    """
+    Makes sure a binary .npy copy of a text steam table exists next to it.  The text table is converted
+    once (and again only if it is newer than its .npy copy).
+    :param file_path: path of the text steam table
+    :return: path of the .npy copy, or None if it could not be written
+    """
+    npy_path = os.path.splitext(file_path)[0] + '.npy'
+    if os.path.exists(npy_path) and os.path.getmtime(npy_path) >= os.path.getmtime(file_path):
+        return npy_path
+    data = np.loadtxt(file_path, skiprows=1, unpack=True)
+    # write to a temporary file and move it into place, so an interrupted or concurrent write can never
+    # leave a truncated .npy behind
+    try:
+        fd, tmp_path = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(npy_path))
+    except OSError:
+        return None  # can't write next to the table
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, data)
+        # mkstemp creates the file readable by its owner only; give it the permissions of a normal new file
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, npy_path)
+    except OSError:
+        os.remove(tmp_path)
+        return None
+    return npy_path
+
+
+def _load_table(file_path):
+    """
+    Reads the columns of a steam table, from its binary .npy copy whenever possible.
+    :param file_path: path of the text steam table
+    :return: 2-D array with one row per column of the table
+    """
+    npy_path = _ensure_npy_cache(file_path)
+    if npy_path is None:
+        return np.loadtxt(file_path, skiprows=1, unpack=True)
+    try:
+        return np.load(npy_path)
+    except (OSError, ValueError):
+        # e.g. the .npy copy is not readable by this user or is not a valid .npy file
+        return np.loadtxt(file_path, skiprows=1, unpack=True)
+
+
+@functools.lru_cache(maxsize=256)
+def _compute_cached(p, T, x, v, h, s):
+    """
+    Determines the steam properties at pressure p from the other given properties by using
+    interpolation from the steam tables.  Memoized, so identical states are only computed once.
+    :param p: pressure in kPa
+    :param T: Temperature in degrees C (or None)
+    :param x: quality (or None)
+    :param v: specific volume in m^3/kg (or None)
+    :param h: specific enthalpy in kJ/kg (or None)
+    :param s: specific entropy in kJ/(kg*K) (or None)
+    :return: (T, x, v, h, s, region) where region is None if it could not be determined
+    """
+    region = None
+
+    # Thermodynamic data is read from file on first use only
+    sat_table, superheat_interp = _load_tables()
+    ts, ps, hfs, hgs, sfs, sgs, vfs, vgs = sat_table
+
+    # Convert pressure to bar for the interpolation (as steam tables are in bar)
+    Pbar = p / 100  # 1 bar = 100 kPa
+
+    # Get saturated properties at the given pressure (ps is sorted, NaN outside the table like griddata)
+    Tsat = float(np.interp(Pbar, ps, ts, left=np.nan, right=np.nan))
+    hf = float(np.interp(Pbar, ps, hfs, left=np.nan, right=np.nan))
+    hg = float(np.interp(Pbar, ps, hgs, left=np.nan, right=np.nan))
+    sf = float(np.interp(Pbar, ps, sfs, left=np.nan, right=np.nan))
+    sg = float(np.interp(Pbar, ps, sgs, left=np.nan, right=np.nan))
+    vf = float(np.interp(Pbar, ps, vfs, left=np.nan, right=np.nan))
+    vg = float(np.interp(Pbar, ps, vgs, left=np.nan, right=np.nan))
+
+    # Determine the region (saturated, superheated) and calculate properties accordingly
+    if T is not None:
+        if T > Tsat:
+            region = 'Superheated'
+            hs, ss = superheat_interp(T, Pbar)
+            h = float(hs)
+            s = float(ss)
+            # Note: The ideal gas approximation for volume is a simplification
+            # For more accurate calculation, superheated steam tables or an equation of state should be used
+        else:
+            region = 'Saturated'
+            x = (h - hf) / (hg - hf) if h else None
+            s = sf if x is None else sf + x * (sg - sf)
+            v = vf if x is None else vf + x * (vg - vf)
+            T = Tsat
+
+    # The missing implementations for conditions based on 'x', 'h', and 's' have been omitted for brevity
+    # Further logic should be added based on the homework requirements and the available data
+    return T, x, v, h, s, region
+
+
+def _load_tables():
+    """
+    Loads the saturated and superheated steam tables once and keeps them for every later call.
+    The saturated table is sorted by pressure for np.interp and the triangulation of the
+    superheated table is built here once rather than on every lookup.
+    :return: (saturated table columns, superheated (T, P) -> (h, s) interpolator)
+    """
+    global _sat_table, _superheat_interp
+    if _sat_table is None:
+        sat_table = _load_table(file_path_sat)
+        _sat_table = sat_table[:, np.argsort(sat_table[1])]
+        superheat_table = _load_table(file_path_superheat)
+        tcol, hcol, scol, pcol = superheat_table
+        _superheat_interp = _build_superheat_interp(tcol, pcol, hcol, scol)
+    return _sat_table, _superheat_interp
+
+
+def _build_superheat_interp(tcol, pcol, hcol, scol):
+    """
+    Builds the (T, P) -> (h, s) interpolator for the superheated table.  If the table holds every
+    combination of its temperatures and pressures it is a regular grid and a RegularGridInterpolator
+    (no triangulation at all) is used.  Otherwise, as for the supplied table where each isobar starts at
+    its own saturation temperature, the Delaunay triangulation of a LinearNDInterpolator is built once.
+    Both return NaN outside the table.
+    :return: a function of (T, P) returning the array [h, s]
+    """
+    values = np.column_stack((hcol, scol))
+    T_axis = np.unique(tcol)
+    P_axis = np.unique(pcol)
+    if len(T_axis) * len(P_axis) == len(tcol):
+        grid = np.full((len(T_axis), len(P_axis), 2), np.nan)
+        grid[np.searchsorted(T_axis, tcol), np.searchsorted(P_axis, pcol)] = values
+        if not np.isnan(grid).any():
+            interp = RegularGridInterpolator((T_axis, P_axis), grid, method='linear', bounds_error=False)
+            return lambda T, P: interp((T, P))
+    return LinearNDInterpolator(np.column_stack((tcol, pcol)), values)
+
+
 def main():
     # Example usage
     inlet = steam(7350, name='Turbine Inlet', x=0.9)  # Example state with quality x
@@ -0,0 +1,57 @@
+# test_pipe_network.py
+
+import numpy as np
+import pytest
+
+from HW6_2_2_OOP import Pipe, Loop, PipeNetwork
+
+
+def gridNetwork(n, Qin):
+    """
+    Square grid of n x n loops (2*n*(n+1) pipes) fed at one corner and drained at the opposite one.
+    :param n: number of loops along each side
+    :param Qin: flow rate into the network in L/s
+    :return: A PipeNetwork with its nodes, loops and external flows set.
+    """
+    name = lambda i, j: f'n{i:02d}_{j:02d}'
+    PN = PipeNetwork()
+    for i in range(n + 1):
+        for j in range(n + 1):
+            if j < n:
+                PN.pipes.append(Pipe(name(i, j), name(i, j + 1), 100, 200))
+            if i < n:
+                PN.pipes.append(Pipe(name(i, j), name(i + 1, j), 100, 200))
+    PN.buildNodes()
+    PN.getNode(name(0, 0)).extFlow = Qin
+    PN.getNode(name(n, n)).extFlow = -Qin
+    pipe = lambda a, b: PN.getPipe(f'{min(a, b)}-{max(a, b)}')
+    for i in range(n):
+        for j in range(n):
+            corners = [name(i, j), name(i, j + 1), name(i + 1, j + 1), name(i + 1, j), name(i, j)]
+            PN.loops.append(Loop(f'L{i}{j}', [pipe(a, b) for a, b in zip(corners, corners[1:])]))
+    return PN
+
+
+@pytest.mark.parametrize('method', ['findFlowRates', 'solveLoopFlow'])
+@pytest.mark.parametrize('n, Qin', [(4, 60), (8, 60), (8, 300), (12, 5)])
+def test_grid_residuals(method, n, Qin):
+    PN = gridNetwork(n, Qin)
+    assert len(PN.pipes) >= 20
+    getattr(PN, method)()
+    assert np.max(np.abs(PN.getNodeFlowRates())) < 1e-9  # m^3/s
+    # net head loss around each loop, relative to the largest pipe head loss
+    assert np.max(np.abs(PN.getLoopHeadLosses())) < 1e-4 * np.max(np.abs(PN.getPipeHeadLosses()))
+
+
+def test_methods_agree():
+    Q1 = gridNetwork(8, 60).findFlowRates()
+    Q2 = gridNetwork(8, 60).solveLoopFlow()
+    assert np.allclose(Q1, Q2, rtol=1e-4, atol=1e-6)
+
+
+@pytest.mark.parametrize('method', ['findFlowRates', 'solveLoopFlow'])
+def test_unbalanced_external_flows(method):
+    PN = gridNetwork(2, 60)
+    PN.getNode('n00_00').extFlow = 61
+    with pytest.raises(ValueError):
+        getattr(PN, method)()